@@ -17,9 +17,58 @@ import numpy as np
 from lmfit import Minimizer, Parameters, Parameter
 import random
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from multiprocessing import shared_memory
+
+# %% SIMULATION
+def simulate_at_times(model, times, selections):
+    """
+    Simulates the model from its current state and returns the values of the selections
+    at each of the specified times only, as a numpy.ndarray. Unlike RoadRunner.simulate(),
+    the times do not need to be evenly spaced.
+
+    The model state at the first time is taken as the initial state, matching
+    RoadRunner.simulate(time_start, time_end, num_pts, selections). Variable step size
+    integration is disabled during the simulation so that each step ends at an output time.
+
+    :param model: RoadRunner object instance
+    :param times: array-like: strictly increasing output times
+    :param selections: list of str: ids matching model identifiers
+    :return: numpy.ndarray: one row per time, one column per selection
+    """
+    times = np.asarray(times, dtype=float)
+    if np.any(np.diff(times) <= 0):
+        raise ValueError('Simulation times must be strictly increasing.')
+    result = np.zeros((len(times), len(selections)))
+    result[0] = [model.getValue(selection) for selection in selections]
+    variable_step_size = model.integrator.variable_step_size
+    model.integrator.variable_step_size = False
+    try:
+        for idx in range(1, len(times)):
+            # Integrate between consecutive output times, only resetting the integrator once
+            time = model.oneStep(times[idx - 1], times[idx] - times[idx - 1], idx == 1)
+            if not np.isclose(time, times[idx]):
+                raise RuntimeError(f'Integrator stopped at time {time} instead of {times[idx]}.')
+            result[idx] = [model.getValue(selection) for selection in selections]
+    finally:
+        model.integrator.variable_step_size = variable_step_size
+    return result
+
+
+def is_uniform_grid(times):
+    """
+    Returns 'True' if the times are evenly spaced, 'False' if they are not.
+
+    :param times: array-like
+    :return: bool
+    """
+    intervals = np.diff(times)
+    return len(intervals) == 0 or np.allclose(intervals, intervals[0])
+
 
 # %% DATA GENERATION
-def get_data(model, noise_level=0.5, time_start=0, time_end=10, num_pts=10, species=None):
+def get_data(model, noise_level=0.5, time_start=0, time_end=10, num_pts=10, species=None, times=None):
     """
     Returns a noisy synthetic dataset for the specified model to mimic
     experimental results, as a numpy.ndarray.
@@ -35,6 +84,7 @@ def get_data(model, noise_level=0.5, time_start=0, time_end=10, num_pts=10, spec
     :param time_end: float
     :param num_pts: int:  number of points to sample
     :param species: list of str: species names matching model identifiers
+    :param times: array-like: arbitrary sampling times, overrides time_start, time_end and num_pts
     :return: numpy.ndarray: time in first column, followed by columns of species
         concentrations over timecourse
     """
@@ -42,7 +92,10 @@ def get_data(model, noise_level=0.5, time_start=0, time_end=10, num_pts=10, spec
     model.resetAll()
 
     # Run simulation, store sampling times and data (concentration measurements)
-    if species is None:
+    if times is not None:
+        selections = model.timeCourseSelections[1:] if species is None else species
+        simulation_result = np.insert(simulate_at_times(model, times, selections), 0, times, axis=1)
+    elif species is None:
         simulation_result = model.simulate(time_start, time_end, num_pts)
     else:
         simulation_result = model.simulate(time_start, time_end, num_pts, ['time'] + species)
@@ -70,7 +123,7 @@ class ParameterEstimation:
     Provides parameter estimation functionality for the MiMB reproducible modeling study
     of BIOMD0000000012 using lmfit package.
     """
-    def __init__(self, model, data, params, species_selections):
+    def __init__(self, model, data, params, species_selections, tolerances=None, polish_tolerances=None):
         """
         User supplies a RoadRunner object instance of the model system being studied,
         and experimental data in a numpy.ndarray object with the first column containing
@@ -85,6 +138,14 @@ class ParameterEstimation:
         must be passed. The names of the species must match the ids used by the RoadRunner
         object instance to simulate the model.
 
+        Sampling times do not need to be evenly spaced, and the model is only integrated to
+        the times in the first column. Species sampled at different times are supported by
+        using the union of all sampling times in the first column and numpy.nan for any
+        value that was not measured; missing values do not contribute to the residuals.
+
+        Integrator tolerances may be loosened for the global search and tightened for a
+        final local polishing fit of the global optimum.
+
         :param model: RoadRunner object instance:
                 Model generated using tellurium.loada(antimony_str) or tellurium.loadSBMLModel(SBML_str)
         :param data: numpy.ndarray:
@@ -92,16 +153,24 @@ class ParameterEstimation:
         :param params: dict: params={ "param_1": (lower_bound, init_value, upper_bound),...
                 "param_n" : (lower_bound, init_value, upper_bound)}
         :param species_selections: list: contains list of species measured in the provided dataset
+        :param tolerances: tuple: (absolute_tolerance, relative_tolerance) of the integrator
+                during the global search, the model's integrator settings are used if None
+        :param polish_tolerances: tuple: (absolute_tolerance, relative_tolerance) of the integrator
+                during a local leastsq fit started from the global optimum, no polishing if None
         """
         self.model = model
         self.data = data
         self.time_start = data[0, 0]
         self.time_end = data[-1, 0]
         self.num_pts = np.shape(data)[0]
+        self.uniform_times = is_uniform_grid(data[:, 0])
         self.species_selections = species_selections
         self.param_ids = list(params.keys())
         self.param_ranges = list(params.values())
         self.num_params = len(self.param_ids)
+        self.default_tolerances = (model.integrator.absolute_tolerance, model.integrator.relative_tolerance)
+        self.tolerances = tolerances
+        self.polish_tolerances = polish_tolerances
 
     def get_parameters(self):
         """
@@ -117,10 +186,38 @@ class ParameterEstimation:
                                              max=self.param_ranges[idx][2])
         return parameters
 
+    def set_integrator_tolerances(self, tolerances=None):
+        """
+        Sets the absolute and relative tolerances of the model integrator.
+
+        :param tolerances: tuple: (absolute_tolerance, relative_tolerance),
+                restores the model's original tolerances if None
+        """
+        if tolerances is None:
+            tolerances = self.default_tolerances
+        self.model.integrator.absolute_tolerance = tolerances[0]
+        self.model.integrator.relative_tolerance = tolerances[1]
+
+    def simulate(self):
+        """
+        Simulates the model from its current state, reporting the selected species
+        only at the sampling times of the dataset.
+
+        :return: numpy.ndarray
+        """
+        if self.uniform_times:
+            return self.model.simulate(self.time_start,
+                                       self.time_end,
+                                       self.num_pts,
+                                       self.species_selections)
+        return simulate_at_times(self.model, self.data[:, 0], self.species_selections)
+
     def get_residuals(self, parameters):
         """
         Objective function for minimization routine which returns the difference between
-        the model prediction and a ground truth dataset.
+        the model prediction and a ground truth dataset. Missing values in the dataset
+        have a residual of zero, while invalid (numpy.nan) simulation values are kept so
+        that the minimization routine rejects them.
 
         :param parameters: lmfit Parameters object
         :return: numpy.ndarray
@@ -129,11 +226,9 @@ class ParameterEstimation:
         vals = parameters.valuesdict()
         for param in list(vals.keys()):
             self.model.setValue(param, vals[param])
-        model_prediction = self.model.simulate(self.time_start,
-                                               self.time_end,
-                                               self.num_pts,
-                                               self.species_selections)
-        return np.abs(model_prediction - self.data[:, 1:])
+        residuals = np.abs(self.simulate() - self.data[:, 1:])
+        residuals[np.isnan(self.data[:, 1:])] = 0
+        return residuals
 
     def get_optimized_simulation_data(self, optimized_params):
         """
@@ -145,14 +240,12 @@ class ParameterEstimation:
         self.model.reset()
         for param in self.param_ids:
             self.model.setValue(param, optimized_params.params.valuesdict()[param])
-        return self.model.simulate(self.time_start,
-                                   self.time_end,
-                                   self.num_pts,
-                                   self.species_selections)
+        return self.simulate()
 
     def get_optimized_residuals(self, optimized_params):
         """
         Returns residuals for the specified model using optimized parameters.
+        Missing values in the dataset have a residual of numpy.nan.
 
         :param optimized_params: lmfit.minimizer.MinimizerResult
         :return: numpy.ndarray
@@ -175,22 +268,112 @@ class ParameterEstimation:
         bootstrap_data = np.zeros((np.shape(model_prediction)))
         for i in range(np.shape(bootstrap_data)[0]):
             for j in range(np.shape(bootstrap_data)[1]):
-                bootstrap_data[i, j] = model_prediction[i, j] + random.choice(random.choice(residuals))
+                residual = random.choice(random.choice(residuals))
+                # Redraw residuals of missing values
+                while np.isnan(residual):
+                    residual = random.choice(random.choice(residuals))
+                bootstrap_data[i, j] = model_prediction[i, j] + residual
 
-        # Set negative values to zero for physiological relevance
+        # Set negative values to zero for physiological relevance, keep missing values missing
         synthetic_data = np.where(bootstrap_data < 0, 0, bootstrap_data)
+        synthetic_data[np.isnan(residuals)] = np.nan
+        return np.insert(synthetic_data, 0, time, axis=1)
+
+    @staticmethod
+    def __get_indexed_bootstrap_dataset(model_prediction, residual_pool, indices, time, missing):
+        """
+        Returns a bootstrapped dataset using optimized simulation data and the residuals
+        at the specified indices of a flat pool of residuals.
+
+        :param model_prediction: numpy.ndarray
+        :param residual_pool: numpy.ndarray: one-dimensional array of residuals
+        :param indices: numpy.ndarray: indices into residual_pool, same shape as model_prediction
+        :param time: numpy.ndarray
+        :param missing: numpy.ndarray: boolean array, True where the dataset has no measurement
+        :return: numpy.ndarray
+        """
+        bootstrap_data = model_prediction + residual_pool[indices]
+
+        # Set negative values to zero for physiological relevance, keep missing values missing
+        synthetic_data = np.where(bootstrap_data < 0, 0, bootstrap_data)
+        synthetic_data[missing] = np.nan
         return np.insert(synthetic_data, 0, time, axis=1)
 
     def optimize_parameters(self):
         """
         Optimizes parameters using lmfit Minimizer.minimize routine.
 
+        If polish_tolerances were provided, the global optimum is refined with a
+        local leastsq fit using the tighter integrator tolerances.
+
         :return: lmfit.minimizer.MinimizerResult
         """
         fitter = Minimizer(userfcn=self.get_residuals, params=self.get_parameters())
-        return fitter.minimize(method='differential_evolution')
+        try:
+            self.set_integrator_tolerances(self.tolerances)
+            optimized_params = fitter.minimize(method='differential_evolution')
+            if self.polish_tolerances is not None:
+                self.set_integrator_tolerances(self.polish_tolerances)
+                optimized_params = fitter.minimize(method='leastsq', params=optimized_params.params)
+        finally:
+            # Restore the model's tolerances, also if the integrator failed during the fit
+            self.set_integrator_tolerances()
+        return optimized_params
+
+    def fit_bootstrap_dataset(self, bootstrap_data):
+        """
+        Optimizes parameters against a bootstrapped dataset, repeating the optimization until
+        the system has complex eigenvalues. The dataset of the ParameterEstimation object is
+        restored afterwards.
+
+        :param bootstrap_data: numpy.ndarray:
+            First column must contain times at which each data point was sampled.
+        :return: numpy.ndarray: optimized parameter values ordered as the parameter ids
+        """
+        original_data = self.data
+        self.data = bootstrap_data
+        try:
+            # Reset model parameters and concentrations
+            self.model.resetAll()
+
+            # Perform optimization
+            optimization_successful = False
+            while not optimization_successful:
+                try:
+                    optimized_params = self.optimize_parameters()
+                    # Evaluate constraint: system has complex eigenvalues due to known
+                    # oscillatory dynamics of BIOMD0000000012
+                    if np.iscomplex(self.model.getFullEigenValues()).any():
+                        optimization_successful = True
+                except RuntimeError:
+                    continue
+        finally:
+            self.data = original_data
+        return np.array([optimized_params.params.valuesdict()[param] for param in self.param_ids])
 
-    def run_monte_carlo(self, num_itr, optimized_params=None):
+    def fit_shared_bootstrap_dataset(self, shared_arrays, seed):
+        """
+        Generates a bootstrapped dataset from the prediction and residual pool stored in
+        shared memory by drawing residual indices with the specified seed, and optimizes
+        parameters against it.
+
+        :param shared_arrays: SharedArrays: contains 'prediction' and 'residuals' arrays
+        :param seed: int: seed for the residual indices and the optimization routine
+        :return: numpy.ndarray: optimized parameter values ordered as the parameter ids
+        """
+        random.seed(seed)
+        np.random.seed(seed)
+        model_prediction = shared_arrays.arrays['prediction']
+        residual_pool = shared_arrays.arrays['residuals']
+        indices = np.random.randint(0, len(residual_pool), size=np.shape(model_prediction))
+        bootstrap_data = self.__get_indexed_bootstrap_dataset(model_prediction=model_prediction,
+                                                              residual_pool=residual_pool,
+                                                              indices=indices,
+                                                              time=self.data[:, 0],
+                                                              missing=np.isnan(self.data[:, 1:]))
+        return self.fit_bootstrap_dataset(bootstrap_data)
+
+    def run_monte_carlo(self, num_itr, optimized_params=None, num_workers=None):
         """
         Performs bootstrapping of residuals to generate new synthetic data which approximates
         the noise in the original fitting dataset. Uses an optimized parameter set to initiate estimation.
@@ -200,10 +383,18 @@ class ParameterEstimation:
         studied in the MiMB reproducible modeling study, the repressilator model BIOMD0000000012,
         is known to exhibit oscillatory dynamics.
 
+        If num_workers is specified, the iterations are distributed over worker processes.
+        The dataset, the optimized model prediction and the pool of residuals are placed in
+        shared memory, which each worker attaches to without copying. Each worker generates
+        its bootstrapped datasets from seeded residual indices, so only a seed is sent per
+        iteration and only the optimized parameter values are returned.
+
         :param num_itr: int:
             Number of bootstrapping iterations to perform.
         :param optimized_params: lmfit.minimizer.MinimizerResult:
             Result of ParameterEstimation.optimize_parameters() method.
+        :param num_workers: int:
+            Number of worker processes, iterations are performed in this process if None.
         :return: pandas.DataFrame
         """
         # Initialize Monte Carlo routine with model prediction, residuals, and a Monte Carlo array to store results
@@ -215,34 +406,286 @@ class ParameterEstimation:
         residuals = self.get_optimized_residuals(optimized_params=optimized_params)
         mc_array = np.zeros((num_itr, len(self.param_ids)))
 
+        if num_workers is not None:
+            # Draw one seed per iteration so that results do not depend on the number of workers
+            seeds = [random.randrange(2 ** 32) for _ in range(num_itr)]
+            with SharedArrays.create({'data': self.data,
+                                      'prediction': model_prediction,
+                                      'residuals': residuals[~np.isnan(residuals)]}) as shared_arrays:
+                with ProcessPoolExecutor(max_workers=num_workers,
+                                         initializer=_init_monte_carlo_worker,
+                                         initargs=(self.model.getSBML(),
+                                                   shared_arrays,
+                                                   dict(zip(self.param_ids, self.param_ranges)),
+                                                   self.species_selections,
+                                                   self.tolerances,
+                                                   self.polish_tolerances)) as executor:
+                    for itr, param_values in enumerate(executor.map(_run_monte_carlo_worker_iteration, seeds)):
+                        mc_array[itr] = param_values
+            return pd.DataFrame(mc_array, columns=self.param_ids)
+
         # Perform bootstrapping optimization iterations
         for itr in range(num_itr):
             # Generate new bootstrapped dataset
-            self.data = self.__get_bootstrap_dataset(model_prediction=model_prediction,
-                                                     residuals=residuals,
-                                                     time=self.data[:, 0])
-            # Reset model parameters and concentrations
-            self.model.resetAll()
-
-            # Perform optimization
-            optimization_successful = False
-            while not optimization_successful:
-                try:
-                    optimized_params = self.optimize_parameters()
-                    # Evaluate constraint: system has complex eigenvalues due to known
-                    # oscillatory dynamics of BIOMD0000000012
-                    if np.iscomplex(self.model.getFullEigenValues()).any():
-                        optimization_successful = True
-                except RuntimeError:
-                    continue
-
+            bootstrap_data = self.__get_bootstrap_dataset(model_prediction=model_prediction,
+                                                          residuals=residuals,
+                                                          time=self.data[:, 0])
             # Store optimized parameter values in array
-            for param_idx, param in enumerate(self.param_ids):
-                mc_array[itr, param_idx] = optimized_params.params.valuesdict()[param]
+            mc_array[itr] = self.fit_bootstrap_dataset(bootstrap_data)
 
         # Return pandas.DataFrame containing sets of optimized parameter values
         return pd.DataFrame(mc_array, columns=self.param_ids)
 
+    def get_log_probability(self, param_values, sigma):
+        """
+        Returns the unnormalized log posterior probability of a set of parameter values, using
+        a Gaussian likelihood of the residuals and a uniform prior within the parameter ranges.
+        The model is simulated with the integrator tolerances used for the global search.
+
+        As in run_monte_carlo(), parameter sets for which the system does not have complex
+        eigenvalues are excluded because the repressilator model BIOMD0000000012 is known to
+        exhibit oscillatory dynamics.
+
+        :param param_values: array-like: parameter values ordered as the parameter ids
+        :param sigma: numpy.ndarray: standard deviation of the noise for each species
+        :return: float
+        """
+        parameters = self.get_parameters()
+        for param_id, value, param_range in zip(self.param_ids, param_values, self.param_ranges):
+            if not param_range[0] <= value <= param_range[2]:
+                return -np.inf
+            parameters[param_id].value = value
+        try:
+            self.set_integrator_tolerances(self.tolerances)
+            residuals = self.get_residuals(parameters)
+            # Exclude parameter sets for which the simulation failed to produce valid values
+            if np.isnan(residuals).any():
+                return -np.inf
+            if not np.iscomplex(self.model.getFullEigenValues()).any():
+                return -np.inf
+        except RuntimeError:
+            return -np.inf
+        finally:
+            self.set_integrator_tolerances()
+        return -0.5 * np.sum((residuals / sigma) ** 2)
+
+    def run_mcmc(self, num_walkers=32, max_steps=5000, optimized_params=None, burn=None, thin=None,
+                 check_interval=100, num_workers=None, filename=None):
+        """
+        Samples the posterior distribution of the parameters with the emcee affine-invariant
+        ensemble sampler, as an alternative to run_monte_carlo() which requires a full global
+        optimization per bootstrapping iteration.
+
+        The noise of each species is estimated from the residuals of the optimized parameter set,
+        and walkers are initialized in a small ball around it. Every check_interval steps the
+        integrated autocorrelation time is estimated, and sampling stops early once the chain is
+        longer than 50 autocorrelation times and the estimate has changed by less than 1%.
+
+        If num_workers is specified, the walkers are evaluated by worker processes which attach
+        to the dataset in shared memory. If filename is specified, every step of the chain is
+        written to an HDF5 file as it is sampled.
+
+        :param num_walkers: int:
+            Number of walkers, at least twice the number of parameters.
+        :param max_steps: int:
+            Maximum number of steps per walker.
+        :param optimized_params: lmfit.minimizer.MinimizerResult:
+            Result of ParameterEstimation.optimize_parameters() method.
+        :param burn: int:
+            Number of initial steps to discard, twice the maximum autocorrelation time if None.
+        :param thin: int:
+            Keep every thin-th step, half the minimum autocorrelation time if None.
+        :param check_interval: int:
+            Number of steps between convergence checks.
+        :param num_workers: int:
+            Number of worker processes, walkers are evaluated in this process if None.
+        :param filename: str:
+            HDF5 file receiving the chain while it is sampled.
+        :return: tuple: (pandas.DataFrame of posterior samples, dict of convergence diagnostics)
+        """
+        import emcee
+
+        # Estimate the noise of each species from the residuals of the optimized parameter set
+        if optimized_params is not None:
+            pass
+        else:
+            optimized_params = self.optimize_parameters()
+        residuals = self.get_optimized_residuals(optimized_params=optimized_params)
+        measured = ~np.isnan(residuals)
+        sum_squares = np.sum(np.where(measured, residuals, 0) ** 2, axis=0)
+        sigma = np.sqrt(np.divide(sum_squares, measured.sum(axis=0),
+                                  out=np.zeros(np.shape(sum_squares)), where=measured.any(axis=0)))
+        # Species without measured values or fitted exactly would give an infinite or NaN
+        # log probability, their residuals are left unscaled instead
+        sigma[sigma == 0] = 1
+
+        # Initialize walkers in a small ball around the optimized parameter set, within the parameter ranges
+        lower_bounds = np.array([param_range[0] for param_range in self.param_ranges])
+        upper_bounds = np.array([param_range[2] for param_range in self.param_ranges])
+        optimized_values = np.array([optimized_params.params.valuesdict()[param] for param in self.param_ids])
+        initial_state = optimized_values + 1e-3 * (upper_bounds - lower_bounds) * \
+            np.random.randn(num_walkers, self.num_params)
+        initial_state = np.clip(initial_state, lower_bounds, upper_bounds)
+
+        backend = None
+        if filename is not None:
+            backend = emcee.backends.HDFBackend(filename, name='BIOMD0000000012_mcmc')
+            backend.reset(num_walkers, self.num_params)
+
+        # Sample until the autocorrelation time estimate has converged. The exit stack frees the
+        # shared memory and shuts down the worker processes, also if their creation fails.
+        autocorr_history = []
+        previous_autocorr_time = np.inf
+        converged = False
+        with ExitStack() as stack:
+            if num_workers is not None:
+                shared_arrays = stack.enter_context(SharedArrays.create({'data': self.data}))
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=num_workers,
+                                                                   initializer=_init_monte_carlo_worker,
+                                                                   initargs=(self.model.getSBML(),
+                                                                             shared_arrays,
+                                                                             dict(zip(self.param_ids,
+                                                                                      self.param_ranges)),
+                                                                             self.species_selections,
+                                                                             self.tolerances,
+                                                                             self.polish_tolerances)))
+                sampler = emcee.EnsembleSampler(num_walkers, self.num_params, _get_monte_carlo_worker_log_probability,
+                                                args=(sigma,), pool=executor, backend=backend)
+            else:
+                sampler = emcee.EnsembleSampler(num_walkers, self.num_params, self.get_log_probability,
+                                                args=(sigma,), backend=backend)
+
+            for _ in sampler.sample(initial_state, iterations=max_steps):
+                if sampler.iteration % check_interval:
+                    continue
+                autocorr_time = sampler.get_autocorr_time(tol=0)
+                autocorr_history.append(np.mean(autocorr_time))
+                converged = np.all(autocorr_time * 50 < sampler.iteration) and \
+                    np.all(np.abs(previous_autocorr_time - autocorr_time) / autocorr_time < 0.01)
+                if converged:
+                    break
+                previous_autocorr_time = autocorr_time
+
+        # Discard burn-in and thin the chain using the autocorrelation time
+        autocorr_time = np.nan_to_num(sampler.get_autocorr_time(tol=0))
+        if burn is None:
+            burn = min(int(2 * np.max(autocorr_time)), sampler.iteration // 2)
+        if thin is None:
+            thin = max(1, int(0.5 * np.min(autocorr_time)))
+        samples = sampler.get_chain(discard=burn, thin=thin, flat=True)
+
+        diagnostics = {
+            'converged': bool(converged),
+            'num_steps': int(sampler.iteration),
+            'num_simulations': int(sampler.iteration * num_walkers),
+            'acceptance_fraction': float(np.mean(sampler.acceptance_fraction)),
+            'autocorr_time': dict(zip(self.param_ids, autocorr_time.tolist())),
+            'autocorr_history': autocorr_history,
+            'burn': int(burn),
+            'thin': int(thin),
+        }
+        return pd.DataFrame(samples, columns=self.param_ids), diagnostics
+
+
+# %% SHARED MEMORY
+class SharedArrays:
+    """
+    Provides numpy.ndarray views of arrays stored in shared memory blocks, which worker processes
+    can attach to without copying the data. Pickling a SharedArrays object only transfers
+    the names, shapes and dtypes of the blocks.
+    """
+    def __init__(self, handles, owner=False):
+        """
+        Attaches to existing shared memory blocks. Use SharedArrays.create() to place arrays
+        in new shared memory blocks.
+
+        :param handles: dict: handles={ "array_name": (shared_memory_name, shape, dtype),...}
+        :param owner: bool: if True, the blocks are unlinked when closed
+        """
+        self.handles = handles
+        self.owner = owner
+        self.blocks = {}
+        self.arrays = {}
+        for name, (block_name, shape, dtype) in handles.items():
+            self.blocks[name] = shared_memory.SharedMemory(name=block_name)
+            self.arrays[name] = np.ndarray(shape, dtype=dtype, buffer=self.blocks[name].buf)
+
+    @classmethod
+    def create(cls, arrays):
+        """
+        Copies the arrays into new shared memory blocks.
+
+        :param arrays: dict: arrays={ "array_name": numpy.ndarray,...}
+        :return: SharedArrays
+        """
+        handles = {}
+        blocks = []
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array, dtype=float)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            handles[name] = (block.name, array.shape, array.dtype.str)
+            blocks.append(block)
+        shared_arrays = cls(handles, owner=True)
+        for block in blocks:
+            block.close()
+        return shared_arrays
+
+    def close(self):
+        """
+        Detaches from the shared memory blocks, and frees them if this object created them.
+        Array views obtained from this object must no longer be used.
+        """
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+    def __reduce__(self):
+        return SharedArrays, (self.handles,)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# State of a Monte Carlo worker process, set by _init_monte_carlo_worker()
+_monte_carlo_worker = {}
+
+
+def _init_monte_carlo_worker(sbml, shared_arrays, params, species_selections, tolerances, polish_tolerances):
+    """
+    Initializes a Monte Carlo worker process with its own RoadRunner object instance and a
+    ParameterEstimation object whose dataset is the shared memory copy of the original dataset.
+    """
+    import roadrunner
+    _monte_carlo_worker['shared_arrays'] = shared_arrays
+    _monte_carlo_worker['parameter_estimation'] = ParameterEstimation(model=roadrunner.RoadRunner(sbml),
+                                                                      data=shared_arrays.arrays['data'],
+                                                                      params=params,
+                                                                      species_selections=species_selections,
+                                                                      tolerances=tolerances,
+                                                                      polish_tolerances=polish_tolerances)
+
+
+def _run_monte_carlo_worker_iteration(seed):
+    """
+    Performs a single bootstrapping iteration in a Monte Carlo worker process.
+    """
+    return _monte_carlo_worker['parameter_estimation'].fit_shared_bootstrap_dataset(
+        shared_arrays=_monte_carlo_worker['shared_arrays'], seed=seed)
+
+
+def _get_monte_carlo_worker_log_probability(param_values, sigma):
+    """
+    Returns the log posterior probability of a set of parameter values in a Monte Carlo worker process.
+    """
+    return _monte_carlo_worker['parameter_estimation'].get_log_probability(param_values, sigma)
+
 # %% PARAMETER ESTIMATION FIGURES
 import matplotlib.pyplot as plt
 from math import pi
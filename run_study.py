@@ -0,0 +1,581 @@
+"""
+Developer: Veronica Porubsky
+Developer ORCID: 0000-0001-7216-3368
+Developer GitHub Username: vporubsky
+Developer Email: verosky@uw.edu
+Model Source: Elowitz and Leibler (2000) repressilator model
+Model Publication DOI: 10.1038/35002125
+Model BioModel ID: BIOMD0000000012
+Model BioModel URL: https://www.ebi.ac.uk/biomodels/BIOMD0000000012
+
+Description: Command-line runner for the full BIOMD0000000012 modeling study.
+
+The study is expressed as a graph of steps (load -> simulate -> synthesize data -> fit ->
+Monte Carlo -> figures). Each step is cached on disk under a key computed from the step
+name, the source code of the step (and of BIOMD0000000012_study_utils.py if the step uses
+it), the study settings it reads and the keys of the steps it depends on, so changing a
+single setting or function only re-runs the steps downstream of it. Steps whose dependencies are
+complete run concurrently in separate processes, and all figures are written to file
+(no interactive windows are opened).
+
+Example:
+    python run_study.py --output-dir study_output --jobs 4
+    python run_study.py --param n=0.0001,2,5 --num-itr 20
+
+(Elowitz and Leibler repressilator model, 2000, DOI: 10.1038/35002125)
+See: https://www.ebi.ac.uk/biomodels/BIOMD0000000012 for model documentation on BioModels Database.
+"""
+import matplotlib
+matplotlib.use('Agg')
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import random
+import shutil
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+
+# %% Study settings
+# Default parameter ranges match estimate_parameters.py:
+# (minimum search value, initial search value, maximum search value)
+DEFAULT_PARAMETERS = {
+    "n": (0.0001, 1, 5),
+    "tau_mRNA": (0.0001, 1, 5),
+    "ps_a": (0.0001, 1, 5),
+    "ps_0": (0.0001, 1, 5)
+}
+
+DEFAULT_SPECIES = ['PX', 'PY', 'PZ']
+
+
+# %% Study steps
+# Each step is a module-level function so that it can be executed in a worker process.
+# A step receives the study settings, the outputs of the steps it depends on and a
+# directory in which to write its file artifacts. The returned value is cached.
+
+def load_model(config, inputs, step_dir):
+    """
+    Loads BIOMD0000000012 and returns its SBML string, which downstream steps use to
+    construct their own RoadRunner object instances.
+    """
+    import tellurium as te
+    model = te.loadSBMLModel(config['model'])
+    model.exportToSBML(os.path.join(step_dir, 'BIOMD0000000012.xml'))
+    return model.getSBML()
+
+
+def simulate_model(config, inputs, step_dir):
+    """
+    Simulates BIOMD0000000012 and stores the simulation results in HDF5.
+    """
+    import tellurium as te
+    import h5py
+    model = te.loadSBMLModel(inputs['load'])
+    simulation = model.simulate(0, config['sim_time_end'], config['sim_num_pts'])
+    with h5py.File(os.path.join(step_dir, 'BIOMD0000000012_simulation_results.h5'), 'w') as h5f:
+        dataset = h5f.create_dataset('BIOMD0000000012_tellurium_simulation', data=simulation)
+        dataset.attrs['Version information'] = te.getVersionInfo()
+        dataset.attrs['BioModels Database ID'] = 'BIOMD0000000012'
+        dataset.attrs['Model system'] = 'repressilator'
+    return {'columns': list(simulation.colnames), 'values': np.array(simulation)}
+
+
+def synthesize_data(config, inputs, step_dir):
+    """
+    Generates a noisy synthetic dataset and stores it in HDF5.
+    """
+    import tellurium as te
+    import h5py
+    from BIOMD0000000012_study_utils import get_data
+    np.random.seed(config['seed'])
+    model = te.loadSBMLModel(inputs['load'])
+    data = get_data(model,
+                    noise_level=config['noise_level'],
+                    time_start=0,
+                    time_end=config['data_time_end'],
+                    num_pts=config['data_num_pts'],
+                    species=config['species'])
+    with h5py.File(os.path.join(step_dir, 'BIOMD0000000012_synthetic_data.h5'), 'w') as h5f:
+        h5f.create_dataset('BIOMD0000000012_synthetic_dataset', data=data)
+    return data
+
+
+def fit_parameters(config, inputs, step_dir):
+    """
+    Estimates parameters against the synthetic dataset and returns the optimized values.
+    """
+    import tellurium as te
+    from BIOMD0000000012_study_utils import ParameterEstimation
+    random.seed(config['seed'])
+    np.random.seed(config['seed'])
+    model = te.loadSBMLModel(inputs['load'])
+    parameter_estimation = ParameterEstimation(model=model,
+                                               data=inputs['synthesize'],
+                                               params=config['params'],
+                                               species_selections=config['species'],
+                                               tolerances=config['tolerances'],
+                                               polish_tolerances=config['polish_tolerances'])
+    optimized_params = parameter_estimation.optimize_parameters()
+    return optimized_params.params.valuesdict()
+
+
+def run_monte_carlo(config, inputs, step_dir):
+    """
+    Estimates the distribution of parameter values around the optimized parameter set, either
+    by bootstrapping of residuals or by MCMC sampling of the posterior, and stores the
+    parameter sets in HDF5.
+    """
+    import tellurium as te
+    from lmfit import Parameters
+    from lmfit.minimizer import MinimizerResult
+    from BIOMD0000000012_study_utils import ParameterEstimation
+    random.seed(config['seed'])
+    np.random.seed(config['seed'])
+    model = te.loadSBMLModel(inputs['load'])
+    parameter_estimation = ParameterEstimation(model=model,
+                                               data=inputs['synthesize'],
+                                               params=config['params'],
+                                               species_selections=config['species'],
+                                               tolerances=config['tolerances'],
+                                               polish_tolerances=config['polish_tolerances'])
+    parameters = Parameters()
+    for param_id, value in inputs['fit'].items():
+        parameters.add(param_id, value=value)
+    if config['uq_method'] == 'mcmc':
+        monte_carlo_data, diagnostics = parameter_estimation.run_mcmc(
+            num_walkers=config['mcmc_walkers'],
+            max_steps=config['mcmc_steps'],
+            optimized_params=MinimizerResult(params=parameters),
+            num_workers=config['mc_workers'],
+            filename=os.path.join(step_dir, 'BIOMD0000000012_mcmc_chain.h5'))
+        with open(os.path.join(step_dir, 'BIOMD0000000012_mcmc_diagnostics.json'), 'w') as f:
+            json.dump(diagnostics, f, indent=4)
+    else:
+        monte_carlo_data = parameter_estimation.run_monte_carlo(num_itr=config['num_itr'],
+                                                                optimized_params=MinimizerResult(params=parameters),
+                                                                num_workers=config['mc_workers'])
+    monte_carlo_data.to_hdf(os.path.join(step_dir, 'BIOMD0000000012_monte_carlo_data.h5'),
+                            key='BIOMD0000000012_estimated_parameters',
+                            mode='w')
+    return monte_carlo_data
+
+
+def plot_simulation(config, inputs, step_dir):
+    """
+    Plots the simulated timecourse of BIOMD0000000012.
+    """
+    import matplotlib.pyplot as plt
+    simulation = inputs['simulate']
+    plt.figure(figsize=(10, 6))
+    plt.plot(simulation['values'][:, 0], simulation['values'][:, 1:])
+    plt.legend(simulation['columns'][1:])
+    plt.xlabel('Time')
+    plt.ylabel('Concentration')
+    plt.savefig(os.path.join(step_dir, 'BIOMD0000000012_simulation.png'), dpi=300)
+    plt.close()
+
+
+def plot_fit(config, inputs, step_dir):
+    """
+    Plots the synthetic dataset against a simulation using the optimized parameter set.
+    """
+    import tellurium as te
+    import matplotlib.pyplot as plt
+    data = inputs['synthesize']
+    model = te.loadSBMLModel(inputs['load'])
+    for param_id, value in inputs['fit'].items():
+        model.setValue(param_id, value)
+    simulation = model.simulate(0, config['data_time_end'], 1000, ['time'] + config['species'])
+    plt.figure(figsize=(10, 6))
+    plt.plot(data[:, 0], data[:, 1:], '.')
+    plt.gca().set_prop_cycle(None)
+    plt.plot(simulation[:, 0], simulation[:, 1:])
+    plt.legend(config['species'])
+    plt.xlabel('Time')
+    plt.ylabel('Concentration')
+    plt.savefig(os.path.join(step_dir, 'BIOMD0000000012_parameter_estimation_fit.png'), dpi=300)
+    plt.close()
+
+
+def plot_parameter_clusters(config, inputs, step_dir):
+    """
+    Creates a radar plot of all estimated parameter sets, using kmeans clustering
+    to identify "families" of parameter values.
+    """
+    import matplotlib.pyplot as plt
+    from sklearn.cluster import KMeans
+    from BIOMD0000000012_study_utils import set_radar_plot_properties
+    monte_carlo_data = inputs['monte_carlo']
+    km = KMeans(n_clusters=config['n_clusters'], random_state=config['seed'])
+    km.fit(monte_carlo_data.values)
+    labels = km.labels_
+
+    plt.figure()
+    ax, angles = set_radar_plot_properties(monte_carlo_data)
+    for i in range(np.shape(monte_carlo_data)[0]):
+        values = monte_carlo_data.iloc[i].values.flatten().tolist()
+        values += values[:1]
+        if labels[i] == 1:
+            ax.plot(angles, values, linewidth=1, color='royalblue', alpha=0.05, linestyle='solid')
+        else:
+            ax.plot(angles, values, linewidth=1, color='darkorange', alpha=0.05, linestyle='solid')
+    plt.savefig(os.path.join(step_dir, 'BIOMD0000000012_parameter_estimation_clusters.png'), dpi=300)
+    plt.close()
+
+
+def plot_parameter_histograms(config, inputs, step_dir):
+    """
+    Plots histograms of the estimated parameter values with 95% confidence intervals.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    monte_carlo_data = inputs['monte_carlo']
+    sns.set_theme()
+    sns.set_style('white')
+    data = monte_carlo_data.to_numpy()
+
+    # Calculate 95th percentile of data with upper and lower confidence interval
+    ci_lower = np.percentile(data, q=2.5, axis=0)
+    ci_upper = np.percentile(data, q=97.5, axis=0)
+
+    plt.rcParams.update({'font.size': 14})
+    fig = plt.figure(figsize=(10, 10))
+    num_cols = int(np.ceil(np.sqrt(np.shape(data)[1])))
+    num_rows = int(np.ceil(np.shape(data)[1] / num_cols))
+    for i in range(np.shape(data)[1]):
+        fig.add_subplot(num_rows, num_cols, i + 1)
+        plt.xlabel(monte_carlo_data.keys()[i])
+        height, bins, patches = plt.hist(data[:, i], bins=25)
+        plt.vlines(x=[ci_lower[i], ci_upper[i]], ymin=0, ymax=height.max(), linestyles='dashed')
+        plt.fill_betweenx([0, height.max()], ci_lower[i], ci_upper[i], color='b', alpha=0.1)
+    plt.savefig(os.path.join(step_dir, 'BIOMD0000000012_parameter_estimation_histograms.png'), dpi=300)
+    plt.close()
+
+
+# %% Step graph
+# name: (function, names of steps whose outputs are required, settings read by the step)
+STEPS = {
+    'load': (load_model, [], ['model', 'model_checksum']),
+    'simulate': (simulate_model, ['load'], ['sim_time_end', 'sim_num_pts']),
+    'synthesize': (synthesize_data, ['load'],
+                   ['species', 'noise_level', 'data_time_end', 'data_num_pts', 'seed']),
+    'fit': (fit_parameters, ['load', 'synthesize'],
+            ['params', 'species', 'tolerances', 'polish_tolerances', 'seed']),
+    'monte_carlo': (run_monte_carlo, ['load', 'synthesize', 'fit'], ['params', 'species', 'uq_method', 'seed']),
+    'simulation_figure': (plot_simulation, ['simulate'], []),
+    'fit_figure': (plot_fit, ['load', 'synthesize', 'fit'], ['species', 'data_time_end']),
+    'cluster_figure': (plot_parameter_clusters, ['monte_carlo'], ['n_clusters', 'seed']),
+    'histogram_figure': (plot_parameter_histograms, ['monte_carlo'], []),
+}
+
+# Additional settings read by the monte_carlo step for each uncertainty quantification method.
+# MCMC results do not depend on the number of workers because walkers are proposed in the main process.
+UQ_METHOD_SETTINGS = {
+    'bootstrap': ['tolerances', 'polish_tolerances', 'num_itr'],
+    'mcmc': ['tolerances', 'mcmc_walkers', 'mcmc_steps'],
+}
+
+
+def get_step_settings(name, config):
+    """
+    Returns the settings read by a step with the specified study settings.
+
+    Bootstrapping results depend on whether worker processes are used, which draw a seed per
+    iteration, but not on the number of workers.
+
+    :param name: str: step name
+    :param config: dict: study settings
+    :return: dict: setting name -> value
+    """
+    names = list(STEPS[name][2])
+    if name == 'monte_carlo':
+        names += UQ_METHOD_SETTINGS[config['uq_method']]
+    settings = {setting: config[setting] for setting in names}
+    if name == 'monte_carlo' and config['uq_method'] == 'bootstrap':
+        settings['use_workers'] = config['mc_workers'] is not None
+    return settings
+
+
+STUDY_UTILS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'BIOMD0000000012_study_utils.py')
+
+
+def get_step_code_checksum(name):
+    """
+    Returns the SHA-256 checksum of the source code of a step function, including
+    BIOMD0000000012_study_utils.py if the step imports it, so that cached results are
+    invalidated when the code computing them changes.
+
+    :param name: str: step name
+    :return: str
+    """
+    source = inspect.getsource(STEPS[name][0])
+    checksum = hashlib.sha256(source.encode())
+    if 'BIOMD0000000012_study_utils' in source:
+        with open(STUDY_UTILS_FILE, 'rb') as f:
+            checksum.update(f.read())
+    return checksum.hexdigest()
+
+
+def get_step_keys(config):
+    """
+    Returns a cache key for every step, computed from the step name, the source code of
+    the step, the settings read by the step and the keys of the steps it depends on.
+
+    :param config: dict: study settings
+    :return: dict: step name -> hexadecimal key
+    """
+    keys = {}
+    for name in get_execution_order():
+        dependencies = STEPS[name][1]
+        payload = json.dumps({'step': name,
+                              'code': get_step_code_checksum(name),
+                              'settings': get_step_settings(name, config),
+                              'dependencies': [keys[dependency] for dependency in dependencies]},
+                             sort_keys=True)
+        keys[name] = hashlib.sha256(payload.encode()).hexdigest()[:16]
+    return keys
+
+
+def get_execution_order(targets=None):
+    """
+    Returns the names of the requested steps and all of their upstream steps,
+    ordered so that each step follows its dependencies.
+
+    :param targets: list of str: step names, all steps if None
+    :return: list of str
+    """
+    order = []
+
+    def visit(name):
+        if name in order:
+            return
+        for dependency in STEPS[name][1]:
+            visit(dependency)
+        order.append(name)
+
+    for name in (targets if targets is not None else STEPS):
+        visit(name)
+    return order
+
+
+def execute_step(step, config, inputs, step_dir):
+    """
+    Runs a single step function and stores its result in the step directory.
+    """
+    os.makedirs(step_dir, exist_ok=True)
+    result = step(config, inputs, step_dir)
+    with open(os.path.join(step_dir, 'result.pkl'), 'wb') as f:
+        pickle.dump(result, f)
+    return result
+
+
+# File in the output directory listing the artifacts copied there for each step
+ARTIFACT_MANIFEST = '.study_artifacts.json'
+
+
+def load_step_result(step_dir):
+    """
+    Returns the cached result of a step.
+    """
+    with open(os.path.join(step_dir, 'result.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+def run_study(config, targets=None, cache_dir='.study_cache', output_dir='study_output', jobs=1, force=False):
+    """
+    Runs the requested steps of the study and their upstream steps, reusing cached
+    results whose keys are unchanged. Steps whose dependencies are complete are
+    executed concurrently using up to the specified number of worker processes.
+    File artifacts of every executed or cached step are copied to the output directory,
+    replacing the artifacts copied there for the same step by a previous run.
+
+    :param config: dict: study settings
+    :param targets: list of str: step names, all steps if None
+    :param cache_dir: str: directory storing cached step results
+    :param output_dir: str: directory receiving study artifacts
+    :param jobs: int: maximum number of concurrently executing steps
+    :param force: bool: re-run all steps regardless of the cache
+    :return: dict: step name -> step result
+    """
+    order = get_execution_order(targets)
+    keys = get_step_keys(config)
+    step_dirs = {name: os.path.join(cache_dir, f'{name}-{keys[name]}') for name in order}
+    results = {}
+    pending = []
+    for name in order:
+        if not force and os.path.exists(os.path.join(step_dirs[name], 'result.pkl')):
+            print(f'[cached]  {name} ({keys[name]})')
+        else:
+            pending.append(name)
+
+    # Results are loaded lazily: cached steps are only read if a pending step needs them
+    def get_result(name):
+        if name not in results:
+            results[name] = load_step_result(step_dirs[name])
+        return results[name]
+
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name in [name for name in pending
+                         if not any(dependency in pending or dependency in running.values()
+                                    for dependency in STEPS[name][1])]:
+                pending.remove(name)
+                if os.path.isdir(step_dirs[name]):
+                    shutil.rmtree(step_dirs[name])
+                inputs = {dependency: get_result(dependency) for dependency in STEPS[name][1]}
+                print(f'[running] {name} ({keys[name]})')
+                running[executor.submit(execute_step, STEPS[name][0], config, inputs, step_dirs[name])] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                results[name] = future.result()
+                print(f'[done]    {name}')
+
+    # Replace the artifacts previously copied for each step of this run, as listed in the
+    # manifest, keeping the artifacts of steps that were not part of this run
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, ARTIFACT_MANIFEST)
+    artifacts = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            artifacts = json.load(f)
+    for name in order:
+        for file_name in artifacts.get(name, []):
+            if os.path.exists(os.path.join(output_dir, file_name)):
+                os.remove(os.path.join(output_dir, file_name))
+        artifacts[name] = []
+        for file_name in os.listdir(step_dirs[name]):
+            if file_name != 'result.pkl':
+                shutil.copy(os.path.join(step_dirs[name], file_name), os.path.join(output_dir, file_name))
+                artifacts[name].append(file_name)
+    with open(manifest_path, 'w') as f:
+        json.dump(artifacts, f, indent=4, sort_keys=True)
+    return {name: get_result(name) for name in order}
+
+
+# %% Command-line interface
+def get_file_checksum(path):
+    """
+    Returns the SHA-256 checksum of a local file, or None if the path is not a local file
+    (e.g. a BioModels Database URL).
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def parse_parameter(text):
+    """
+    Parses a parameter range of the form 'name=lower,initial,upper'.
+    """
+    try:
+        name, values = text.split('=')
+        lower, initial, upper = (float(value) for value in values.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'name=lower,initial,upper', got '{text}'")
+    return name, (lower, initial, upper)
+
+
+def parse_positive_int(text):
+    """
+    Parses an integer of at least 1.
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got '{text}'")
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected an integer of at least 1, got {value}")
+    return value
+
+
+def get_parser():
+    """
+    Returns the argument parser for the study runner.
+    """
+    parser = argparse.ArgumentParser(description='Run the BIOMD0000000012 reproducible modeling study.')
+    parser.add_argument('steps', nargs='*', metavar='STEP',
+                        help=f"steps to run with their upstream steps, all steps by default: {', '.join(STEPS)}")
+    parser.add_argument('--model', default='BIOMD0000000012.xml',
+                        help='SBML file path or URL of the model')
+    parser.add_argument('--species', nargs='+', default=DEFAULT_SPECIES,
+                        help='species measured in the synthetic dataset and used for fitting')
+    parser.add_argument('--param', dest='params', action='append', type=parse_parameter, default=[],
+                        metavar='NAME=LOWER,INITIAL,UPPER',
+                        help='parameter range to estimate; replaces the default parameter set, may be repeated')
+    parser.add_argument('--sim-time-end', type=float, default=500)
+    parser.add_argument('--sim-num-pts', type=int, default=1000)
+    parser.add_argument('--noise-level', type=float, default=0.2)
+    parser.add_argument('--data-time-end', type=float, default=500)
+    parser.add_argument('--data-num-pts', type=int, default=100)
+    parser.add_argument('--tolerances', nargs=2, type=float, default=None, metavar=('ABSOLUTE', 'RELATIVE'),
+                        help='integrator tolerances during the global parameter search')
+    parser.add_argument('--polish-tolerances', nargs=2, type=float, default=None, metavar=('ABSOLUTE', 'RELATIVE'),
+                        help='integrator tolerances for a local fit polishing the global optimum')
+    parser.add_argument('--uq-method', choices=['bootstrap', 'mcmc'], default='bootstrap',
+                        help='bootstrapping of residuals or MCMC sampling of the parameter posterior')
+    parser.add_argument('--num-itr', type=int, default=5, help='number of bootstrapping iterations')
+    parser.add_argument('--mcmc-walkers', type=int, default=32, help='number of MCMC walkers')
+    parser.add_argument('--mcmc-steps', type=int, default=5000, help='maximum number of MCMC steps per walker')
+    parser.add_argument('--mc-workers', type=parse_positive_int, default=None,
+                        help='number of shared-memory worker processes for bootstrapping or MCMC')
+    parser.add_argument('--n-clusters', type=int, default=2, help='number of parameter set clusters')
+    parser.add_argument('--seed', type=int, default=155)
+    parser.add_argument('--cache-dir', default='.study_cache')
+    parser.add_argument('--output-dir', default='study_output')
+    parser.add_argument('--jobs', type=parse_positive_int, default=os.cpu_count(),
+                        help='maximum number of steps executed concurrently')
+    parser.add_argument('--force', action='store_true', help='ignore cached results')
+    return parser
+
+
+def get_config(args):
+    """
+    Returns the study settings for the parsed command-line arguments.
+
+    :param args: argparse.Namespace: result of get_parser().parse_args()
+    :return: dict: study settings
+    """
+    return {
+        'model': args.model,
+        'model_checksum': get_file_checksum(args.model),
+        'species': args.species,
+        'params': dict(args.params) if args.params else DEFAULT_PARAMETERS,
+        'sim_time_end': args.sim_time_end,
+        'sim_num_pts': args.sim_num_pts,
+        'noise_level': args.noise_level,
+        'data_time_end': args.data_time_end,
+        'data_num_pts': args.data_num_pts,
+        'tolerances': args.tolerances,
+        'polish_tolerances': args.polish_tolerances,
+        'uq_method': args.uq_method,
+        'num_itr': args.num_itr,
+        'mcmc_walkers': args.mcmc_walkers,
+        'mcmc_steps': args.mcmc_steps,
+        'mc_workers': args.mc_workers,
+        'n_clusters': args.n_clusters,
+        'seed': args.seed,
+    }
+
+
+if __name__ == "__main__":
+    PARSER = get_parser()
+    ARGS = PARSER.parse_args()
+    for STEP in ARGS.steps:
+        if STEP not in STEPS:
+            PARSER.error(f"unknown step '{STEP}', choose from: {', '.join(STEPS)}")
+    CONFIG = get_config(ARGS)
+    run_study(CONFIG,
+              targets=ARGS.steps or None,
+              cache_dir=ARGS.cache_dir,
+              output_dir=ARGS.output_dir,
+              jobs=ARGS.jobs,
+              force=ARGS.force)
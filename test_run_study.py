@@ -0,0 +1,179 @@
+"""
+Developer: Veronica Porubsky
+Developer ORCID: 0000-0001-7216-3368
+Developer GitHub Username: vporubsky
+Developer Email: verosky@uw.edu
+Model Source: Elowitz and Leibler (2000) repressilator model
+Model Publication DOI: 10.1038/35002125
+Model BioModel ID: BIOMD0000000012
+Model BioModel URL: https://www.ebi.ac.uk/biomodels/BIOMD0000000012
+
+Description: Program to run a test suite on the cached step graph of the study runner.
+
+(Elowitz and Leibler repressilator model, 2000, DOI: 10.1038/35002125)
+See: https://www.ebi.ac.uk/biomodels/BIOMD0000000012 for model documentation on BioModels Database.
+"""
+import unittest
+import os
+import tempfile
+import shutil
+import run_study
+
+
+# %% Stub steps for testing the scheduler without simulating the model
+# Each stub step records its execution in the log file named in the study settings.
+
+def _log_execution(config, name):
+    with open(config['log'], 'a') as f:
+        f.write(name + '\n')
+
+
+def stub_load(config, inputs, step_dir):
+    _log_execution(config, 'load')
+    return config['model']
+
+
+def stub_fit(config, inputs, step_dir):
+    _log_execution(config, 'fit')
+    with open(os.path.join(step_dir, 'fit.txt'), 'w') as f:
+        f.write(str(config['params']))
+    return (inputs['load'], config['params'])
+
+
+def stub_fit_figure(config, inputs, step_dir):
+    _log_execution(config, 'fit_figure')
+    with open(os.path.join(step_dir, 'fit_figure.txt'), 'w') as f:
+        f.write(str(inputs['fit']))
+    return inputs['fit']
+
+
+def stub_simulate(config, inputs, step_dir):
+    _log_execution(config, 'simulate')
+    with open(os.path.join(step_dir, 'simulate.txt'), 'w') as f:
+        f.write(inputs['load'])
+    return inputs['load']
+
+
+STUB_STEPS = {
+    'load': (stub_load, [], ['model']),
+    'fit': (stub_fit, ['load'], ['params']),
+    'fit_figure': (stub_fit_figure, ['fit'], []),
+    'simulate': (stub_simulate, ['load'], []),
+}
+
+
+# %% Build unit testing suite for run_study using unittest
+class RunStudyTestSuite(unittest.TestCase):
+    """
+    Test suite for the cache keys, execution order and scheduling of the study runner.
+    """
+
+    def setUp(self):
+        self.config = run_study.get_config(run_study.get_parser().parse_args([]))
+        self.steps = dict(run_study.STEPS)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        run_study.STEPS.clear()
+        run_study.STEPS.update(self.steps)
+        shutil.rmtree(self.directory)
+
+    def get_changed_keys(self, **settings):
+        """
+        Returns the names of the steps whose cache keys change with the specified settings.
+        """
+        keys = run_study.get_step_keys(self.config)
+        changed_keys = run_study.get_step_keys(dict(self.config, **settings))
+        return {name for name in keys if keys[name] != changed_keys[name]}
+
+    def run_stub_study(self, targets=None, **settings):
+        """
+        Runs the stub study and returns the names of the executed steps.
+        """
+        run_study.STEPS.clear()
+        run_study.STEPS.update(STUB_STEPS)
+        log = os.path.join(self.directory, 'log.txt')
+        if os.path.exists(log):
+            os.remove(log)
+        config = dict({'model': 'model', 'params': {'n': (0.0001, 1, 5)}, 'log': log}, **settings)
+        run_study.run_study(config,
+                            targets=targets,
+                            cache_dir=os.path.join(self.directory, 'cache'),
+                            output_dir=os.path.join(self.directory, 'output'),
+                            jobs=2)
+        if not os.path.exists(log):
+            return set()
+        with open(log) as f:
+            return set(f.read().split())
+
+    def test_params_change_invalidates_downstream_steps(self):
+        """
+        Check that changing the parameter ranges only changes the keys of the fit step
+        and the steps downstream of it.
+        """
+        params = dict(self.config['params'], n=(0.0001, 2, 5))
+        self.assertEqual(self.get_changed_keys(params=params),
+                         {'fit', 'monte_carlo', 'fit_figure', 'cluster_figure', 'histogram_figure'})
+
+    def test_unused_uq_method_settings(self):
+        """
+        Check that the settings of the uncertainty quantification method which is not
+        selected do not change any cache key.
+        """
+        self.config['uq_method'] = 'bootstrap'
+        self.assertEqual(self.get_changed_keys(mcmc_walkers=8, mcmc_steps=100), set())
+        self.assertEqual(self.get_changed_keys(num_itr=50), {'monte_carlo', 'cluster_figure', 'histogram_figure'})
+
+    def test_bootstrap_worker_count(self):
+        """
+        Check that bootstrapping keys depend on whether worker processes are used,
+        but not on the number of workers.
+        """
+        self.config['uq_method'] = 'bootstrap'
+        self.config['mc_workers'] = 4
+        self.assertEqual(self.get_changed_keys(mc_workers=8), set())
+        self.assertEqual(self.get_changed_keys(mc_workers=None), {'monte_carlo', 'cluster_figure', 'histogram_figure'})
+
+    def test_unused_uq_method_settings_mcmc(self):
+        """
+        Check that bootstrapping settings do not change any cache key when MCMC is selected.
+        """
+        self.config['uq_method'] = 'mcmc'
+        self.assertEqual(self.get_changed_keys(num_itr=50, mc_workers=4), set())
+        self.assertEqual(self.get_changed_keys(mcmc_steps=100), {'monte_carlo', 'cluster_figure', 'histogram_figure'})
+
+    def test_targeted_execution_order(self):
+        """
+        Check that a targeted run includes exactly the upstream steps of the target,
+        each following its dependencies.
+        """
+        order = run_study.get_execution_order(['cluster_figure'])
+        self.assertEqual(set(order), {'load', 'synthesize', 'fit', 'monte_carlo', 'cluster_figure'})
+        for name in order:
+            for dependency in run_study.STEPS[name][1]:
+                self.assertLess(order.index(dependency), order.index(name))
+
+    def test_rerun_after_setting_change(self):
+        """
+        Check that a repeated run uses the cache, and that after changing a setting only
+        the steps downstream of it are executed again.
+        """
+        self.assertEqual(self.run_stub_study(), {'load', 'fit', 'fit_figure', 'simulate'})
+        self.assertEqual(self.run_stub_study(), set())
+        self.assertEqual(self.run_stub_study(params={'n': (0.0001, 2, 5)}), {'fit', 'fit_figure'})
+        with open(os.path.join(self.directory, 'output', 'fit_figure.txt')) as f:
+            self.assertIn('(0.0001, 2, 5)', f.read())
+
+    def test_targeted_run_keeps_other_artifacts(self):
+        """
+        Check that a targeted run only replaces the artifacts of its own steps.
+        """
+        self.run_stub_study()
+        self.assertEqual(self.run_stub_study(targets=['fit_figure'], params={'n': (0.0001, 2, 5)}),
+                         {'fit', 'fit_figure'})
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory, 'output'))),
+                         ['.study_artifacts.json', 'fit.txt', 'fit_figure.txt', 'simulate.txt'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+"""
+Developer: Veronica Porubsky
+Developer ORCID: 0000-0001-7216-3368
+Developer GitHub Username: vporubsky
+Developer Email: verosky@uw.edu
+Model Source: Elowitz and Leibler (2000) repressilator model
+Model Publication DOI: 10.1038/35002125
+Model BioModel ID: BIOMD0000000012
+Model BioModel URL: https://www.ebi.ac.uk/biomodels/BIOMD0000000012
+
+Description: Program to run a test suite on the MiMB reproducible modeling study utilities.
+
+(Elowitz and Leibler repressilator model, 2000, DOI: 10.1038/35002125)
+See: https://www.ebi.ac.uk/biomodels/BIOMD0000000012 for model documentation on BioModels Database.
+"""
+import tellurium as te
+import unittest
+import pickle
+import random
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from lmfit.minimizer import MinimizerResult
+from BIOMD0000000012_study_utils import ParameterEstimation, SharedArrays, simulate_at_times, is_uniform_grid
+
+
+def get_shared_array_sum(shared_arrays):
+    """
+    Returns the sum of the shared array 'values', used to read shared memory in a worker process.
+    """
+    total = shared_arrays.arrays['values'].sum()
+    shared_arrays.close()
+    return total
+
+
+# %% Build unit testing suite for BIOMD0000000012_study_utils using unittest
+class BIOMD0000000012StudyUtilsTestSuite(unittest.TestCase):
+    """
+    Test suite for the simulation and parameter estimation utilities of the MiMB reproducible
+    modeling study. The model is loaded from the BIOMD0000000012.xml file in this repository.
+    """
+
+    def setUp(self):
+        self.model = te.loadSBMLModel('BIOMD0000000012.xml')
+        self.species = ['PX', 'PY', 'PZ']
+
+    def test_simulate_at_times_uniform_grid(self):
+        """
+        Check that simulating at the times of an evenly spaced grid matches
+        RoadRunner.simulate() on the same grid within integrator tolerance.
+        """
+        times = np.linspace(0, 100, 50)
+        self.assertTrue(is_uniform_grid(times))
+
+        self.model.resetAll()
+        expected = self.model.simulate(0, 100, 50, self.species)
+        self.model.resetAll()
+        result = simulate_at_times(self.model, times, self.species)
+
+        np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-6)
+
+    def test_simulate_at_times_variable_step_size(self):
+        """
+        Check that values are recorded at the requested times when the integrator uses
+        variable step sizes, and that the integrator setting is restored afterwards.
+        """
+        times = np.linspace(0, 100, 50)
+        self.model.resetAll()
+        expected = self.model.simulate(0, 100, 50, self.species)
+
+        self.model.resetAll()
+        self.model.integrator.variable_step_size = True
+        result = simulate_at_times(self.model, times, self.species)
+
+        self.assertTrue(self.model.integrator.variable_step_size)
+        np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-6)
+
+    def test_get_residuals_missing_values(self):
+        """
+        Check that missing values in a dataset sampled at unevenly spaced times
+        have a residual of zero, and that measured values do not.
+        """
+        times = np.array([0, 1, 2.5, 5, 10, 20, 40, 75, 100])
+        self.assertFalse(is_uniform_grid(times))
+
+        self.model.resetAll()
+        data = np.insert(simulate_at_times(self.model, times, self.species), 0, times, axis=1)
+        data[:, 1:] += 1
+        data[2, 1] = np.nan
+        data[5, 3] = np.nan
+        missing = np.isnan(data[:, 1:])
+
+        parameter_estimation = ParameterEstimation(model=self.model,
+                                                   data=data,
+                                                   params={"n": (0.0001, 2, 5)},
+                                                   species_selections=self.species)
+        residuals = parameter_estimation.get_residuals(parameter_estimation.get_parameters())
+
+        self.assertFalse(np.isnan(residuals).any())
+        np.testing.assert_array_equal(residuals[missing], 0)
+        self.assertTrue((residuals[~missing] > 0).all())
+
+    def test_get_residuals_invalid_simulation_values(self):
+        """
+        Check that an invalid (numpy.nan) simulation value at a measured point is kept in
+        the residuals instead of being treated as a missing value with a residual of zero.
+        """
+        times = np.array([0, 1, 2.5, 5, 10])
+        self.model.resetAll()
+        data = np.insert(simulate_at_times(self.model, times, self.species), 0, times, axis=1)
+        data[1, 2] = np.nan
+
+        parameter_estimation = ParameterEstimation(model=self.model,
+                                                   data=data,
+                                                   params={"n": (0.0001, 2, 5)},
+                                                   species_selections=self.species)
+        # Replace the simulation with a prediction containing numpy.nan at a measured point
+        prediction = np.nan_to_num(data[:, 1:]) + 1
+        prediction[3, 1] = np.nan
+        parameter_estimation.simulate = lambda: prediction
+        residuals = parameter_estimation.get_residuals(parameter_estimation.get_parameters())
+
+        self.assertTrue(np.isnan(residuals[3, 1]))
+        self.assertEqual(residuals[1, 1], 0)
+        self.assertEqual(np.isnan(residuals).sum(), 1)
+
+
+    def test_shared_arrays_pickling(self):
+        """
+        Check that a pickled SharedArrays object attaches to the same shared memory,
+        in this process and in a worker process.
+        """
+        values = np.arange(12, dtype=float).reshape(3, 4)
+        with SharedArrays.create({'values': values}) as shared_arrays:
+            attached = pickle.loads(pickle.dumps(shared_arrays))
+            self.assertFalse(attached.owner)
+            np.testing.assert_array_equal(attached.arrays['values'], values)
+            attached.close()
+
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                self.assertEqual(executor.submit(get_shared_array_sum, shared_arrays).result(), values.sum())
+
+    def test_shared_arrays_unlinked_after_close(self):
+        """
+        Check that the shared memory blocks are freed when the creating object is closed.
+        """
+        shared_arrays = SharedArrays.create({'values': np.ones(5)})
+        block_name = shared_arrays.handles['values'][0]
+        shared_arrays.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=block_name)
+
+    def test_run_monte_carlo_worker_count(self):
+        """
+        Check that bootstrapping in worker processes gives the same parameter sets
+        for a fixed seed regardless of the number of workers.
+        """
+        times = np.linspace(0, 50, 11)
+        self.model.resetAll()
+        data = np.insert(simulate_at_times(self.model, times, self.species), 0, times, axis=1)
+        data[:, 1:] += np.random.RandomState(0).normal(0, 0.1, np.shape(data[:, 1:]))
+        parameter_estimation = ParameterEstimation(model=self.model,
+                                                   data=data,
+                                                   params={"n": (1.5, 2, 2.5)},
+                                                   species_selections=self.species)
+        optimized_params = MinimizerResult(params=parameter_estimation.get_parameters())
+
+        results = []
+        for num_workers in [2, 3]:
+            random.seed(155)
+            results.append(parameter_estimation.run_monte_carlo(num_itr=3,
+                                                                optimized_params=optimized_params,
+                                                                num_workers=num_workers))
+        pd.testing.assert_frame_equal(results[0], results[1])
+        # Bootstrapped datasets differ between iterations
+        self.assertGreater(results[0]['n'].nunique(), 1)
+        np.testing.assert_array_equal(parameter_estimation.data, data)
+
+
+    def get_noisy_parameter_estimation(self, **kwargs):
+        """
+        Returns a ParameterEstimation object for a noisy dataset simulated with the original
+        parameter values, estimating the Hill coefficient 'n'.
+        """
+        times = np.linspace(0, 50, 11)
+        self.model.resetAll()
+        data = np.insert(simulate_at_times(self.model, times, self.species), 0, times, axis=1)
+        data[:, 1:] += np.random.RandomState(0).normal(0, 0.1, np.shape(data[:, 1:]))
+        return ParameterEstimation(model=self.model,
+                                   data=data,
+                                   params={"n": (0, 2, 5)},
+                                   species_selections=self.species,
+                                   **kwargs)
+
+    def test_get_log_probability_excluded_parameter_sets(self):
+        """
+        Check that parameter sets outside the parameter ranges, or for which the system does not
+        have complex eigenvalues (n = 0 removes the oscillatory dynamics), have zero probability.
+        """
+        parameter_estimation = self.get_noisy_parameter_estimation()
+        sigma = np.ones(len(self.species))
+        self.assertEqual(parameter_estimation.get_log_probability([6], sigma), -np.inf)
+        self.assertEqual(parameter_estimation.get_log_probability([0], sigma), -np.inf)
+        self.assertTrue(np.isfinite(parameter_estimation.get_log_probability([2], sigma)))
+
+    def test_get_log_probability_restores_tolerances(self):
+        """
+        Check that the integrator tolerances are restored after evaluating the log probability.
+        """
+        default_tolerances = (self.model.integrator.absolute_tolerance, self.model.integrator.relative_tolerance)
+        parameter_estimation = self.get_noisy_parameter_estimation(tolerances=(1e-6, 1e-3))
+        parameter_estimation.get_log_probability([2], np.ones(len(self.species)))
+        self.assertEqual((self.model.integrator.absolute_tolerance, self.model.integrator.relative_tolerance),
+                         default_tolerances)
+
+    def test_run_mcmc(self):
+        """
+        Check that a short MCMC run returns samples within the parameter ranges, and that the
+        number of samples is consistent with the reported burn-in and thinning.
+        """
+        np.random.seed(155)
+        parameter_estimation = self.get_noisy_parameter_estimation()
+        optimized_params = MinimizerResult(params=parameter_estimation.get_parameters())
+        samples, diagnostics = parameter_estimation.run_mcmc(num_walkers=4,
+                                                             max_steps=20,
+                                                             optimized_params=optimized_params,
+                                                             check_interval=10)
+
+        self.assertEqual(list(samples.columns), ['n'])
+        self.assertTrue(((samples['n'] >= 0) & (samples['n'] <= 5)).all())
+        self.assertEqual(diagnostics['num_steps'], 20)
+        self.assertLessEqual(diagnostics['burn'], diagnostics['num_steps'] // 2)
+        self.assertGreaterEqual(diagnostics['thin'], 1)
+        self.assertEqual(len(samples),
+                         4 * len(range(diagnostics['burn'] + diagnostics['thin'] - 1, 20, diagnostics['thin'])))
+
+    def test_run_mcmc_unmeasured_species(self):
+        """
+        Check that MCMC sampling succeeds when a species has no measured values.
+        """
+        np.random.seed(155)
+        parameter_estimation = self.get_noisy_parameter_estimation()
+        parameter_estimation.data[:, 3] = np.nan
+        optimized_params = MinimizerResult(params=parameter_estimation.get_parameters())
+        samples, diagnostics = parameter_estimation.run_mcmc(num_walkers=4,
+                                                             max_steps=10,
+                                                             optimized_params=optimized_params,
+                                                             check_interval=10)
+        self.assertFalse(samples.isna().any().any())
+        self.assertGreater(diagnostics['acceptance_fraction'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()